@@ -5,7 +5,7 @@ from __future__ import annotations
 
 import argparse
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import downie_dispatch
 
@@ -14,15 +14,18 @@ from dry_run_from_csv import (
     DEFAULT_DATA_DIR,
     DEFAULT_FAILURES_FILE,
     DEFAULT_FEED_URL,
+    DEFAULT_MAX_WORKERS,
     DEFAULT_STATE_FILE,
     append_processed,
-    collect_urls,
     evaluate_urls,
+    iter_urls,
     load_state,
     save_state,
     write_failures,
 )
 
+CHUNK_SIZE = 200
+
 
 def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Dispatch CSV-listed videos to Downie")
@@ -66,14 +69,43 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
         action="store_true",
         help="Only print evaluation results without sending to Downie",
     )
+    parser.add_argument(
+        "--chunk-size",
+        dest="chunk_size",
+        type=int,
+        default=CHUNK_SIZE,
+        help=f"Number of links evaluated and dispatched per batch (default: {CHUNK_SIZE})",
+    )
+    parser.add_argument(
+        "--workers",
+        dest="workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help=f"Number of links extracted concurrently (default: {DEFAULT_MAX_WORKERS})",
+    )
+    parser.add_argument(
+        "--pretty",
+        action="store_true",
+        help="Write state.json indented instead of compact (for debugging)",
+    )
     return parser.parse_args(argv)
 
 
 def dispatch_media(media_map: Dict[str, List[str]]) -> None:
-    for links in media_map.values():
-        if not links:
-            continue
-        downie_dispatch.send_to_downie(links)
+    all_links = [link for links in media_map.values() for link in links]
+    if all_links:
+        downie_dispatch.send_to_downie(all_links)
+
+
+def _chunks(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 
 def main(argv: Optional[List[str]] = None) -> int:
@@ -84,40 +116,37 @@ def main(argv: Optional[List[str]] = None) -> int:
     failures_path = Path(args.failures_file).expanduser()
     feed_url = args.feed_url
 
-    urls = collect_urls(data_dir)
-    if not urls:
-        print("CSV 文件中没有找到有效的链接")
-        return 1
-
-    print(f"发现 {len(urls)} 个唯一链接")
-
-    successes, failures, extracted = evaluate_urls(
-        urls,
-        cookie_file=args.cookie_file,
-        cookie=args.cookie,
-    )
-
-    print(f"成功解析: {len(successes)} 条, 失败: {len(failures)} 条")
-
-    if not args.dry_run:
-        state = load_state(state_path)
-        append_processed(state, feed_url, successes)
-        save_state(state_path, state)
-
-        if failures:
-            write_failures(
-                failures_path,
-                failures,
-                feed_url=feed_url,
-                action="video_downloader",
+    state: Optional[Dict] = None if args.dry_run else load_state(state_path)
+    processed: Optional[Set[str]] = None
+    total = 0
+    success_count = 0
+    failures: List[Tuple[str, str]] = []
+
+    # Evaluate and dispatch in fixed-size batches so CSV ingestion, network
+    # extraction and Downie hand-off overlap instead of running back to back.
+    try:
+        for chunk in _chunks(iter_urls(data_dir), max(1, args.chunk_size)):
+            total += len(chunk)
+            print(f"发现 {len(chunk)} 个唯一链接 (累计 {total})")
+
+            successes, chunk_failures, extracted = evaluate_urls(
+                chunk,
+                cookie_file=args.cookie_file,
+                cookie=args.cookie,
+                max_workers=args.workers,
             )
-            print(f"已写入失败记录: {failures_path}")
-
-        if successes:
-            dispatch_media({url: extracted.get(url, []) for url in successes})
-        else:
-            print("没有可发送的链接")
-    else:
+            success_count += len(successes)
+            failures.extend(chunk_failures)
+
+            if state is not None:
+                processed = append_processed(state, feed_url, successes, processed)
+                if successes:
+                    dispatch_media({url: extracted.get(url, []) for url in successes})
+    finally:
+        # Persist progress and the failures gathered so far even when a later
+        # chunk raises (e.g. a Downie hand-off error), so neither is lost.
+        if state is not None and total:
+            save_state(state_path, state, pretty=args.pretty)
         if failures:
             write_failures(
                 failures_path,
@@ -125,7 +154,19 @@ def main(argv: Optional[List[str]] = None) -> int:
                 feed_url=feed_url,
                 action="video_downloader",
             )
-            print(f"[DRY RUN] 失败详情已写入: {failures_path}")
+            if state is not None:
+                print(f"已写入失败记录: {failures_path}")
+            else:
+                print(f"[DRY RUN] 失败详情已写入: {failures_path}")
+
+    if not total:
+        print("CSV 文件中没有找到有效的链接")
+        return 1
+
+    print(f"成功解析: {success_count} 条, 失败: {len(failures)} 条")
+
+    if state is not None and not success_count:
+        print("没有可发送的链接")
 
     return 0 if not failures else 1
 
@@ -15,21 +15,41 @@ Usage:
 from __future__ import annotations
 
 import argparse
-import json
+import functools
 import re
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from html import unescape
-from typing import Dict, List, Optional, Tuple
-from urllib.parse import urljoin, urlparse
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
 
-import requests
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    import requests
 
-ARCHIVE_PATH_RE = re.compile(r"/archives/\d+/?$", re.IGNORECASE)
+try:
+    from orjson import loads as json_loads  # type: ignore
+except ImportError:  # pragma: no cover - optional speedup
+    from json import loads as json_loads
+
+
+# Same acceptance as urlparse() plus a path-suffix check: any scheme and host,
+# any path ending in /archives/<id>/ (optionally followed by ;params), then an
+# optional query or fragment.
+ARCHIVE_URL_RE = re.compile(
+    r"^[a-z][a-z0-9+.-]*://[^/?#]+[^?#]*/archives/\d+/?(?:;[^/?#]*)?(?:[?#]|$)",
+    re.IGNORECASE,
+)
+# One negated character class per quote style: the attribute value is consumed
+# linearly instead of via a lazy ``.*?`` that retries at every character.
 DPLAYER_RE = re.compile(
-    r"<div[^>]*class=\"[^\"]*dplayer[^\"]*\"[^>]*data-config=(?P<quote>['\"])(?P<data>.*?)(?P=quote)",
-    re.IGNORECASE | re.DOTALL,
+    r"<div[^>]*class=\"[^\"]*dplayer[^\"]*\"[^>]*data-config="
+    r"(?:'(?P<single>[^']*)'|\"(?P<double>[^\"]*)\")",
+    re.IGNORECASE,
 )
+# Quoted values (e.g. CODECS="avc1.64001f,mp4a.40.2") may contain commas.
+STREAM_INF_ATTR_RE = re.compile(r'([A-Z0-9-]+)=(?:"([^"]*)"|([^,]+))')
 
 DEFAULT_HEADERS = {
     "User-Agent": (
@@ -46,6 +66,52 @@ M3U8_HEADERS = {
 }
 
 
+def _build_session() -> "requests.Session":
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=32,
+        # Retry only transient gateway errors, and never sleep for a server's
+        # Retry-After: urllib3 does not cap it and the request timeout does
+        # not cover it. Rate limits (429) surface via raise_for_status.
+        max_retries=Retry(
+            total=2,
+            backoff_factor=0.2,
+            status_forcelist=[502, 503, 504],
+            respect_retry_after_header=False,
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+# Shared across calls so archive pages and their m3u8 playlists reuse pooled
+# keep-alive connections instead of paying a TCP/TLS handshake per request.
+# Built on first use so that importing this module does not pull in requests.
+_SESSION: Optional["requests.Session"] = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _get_session() -> "requests.Session":
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                _SESSION = _build_session()
+    return _SESSION
+
+
+# Players on the same page each need their own master playlist probe; these
+# are independent network waits, so they are resolved on a shared pool.
+_RESOLVE_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hls-probe")
+
+
 @dataclass
 class VideoResult:
     index: int
@@ -58,16 +124,16 @@ class ArchiveExtractionError(RuntimeError):
 
 
 def ensure_archive_url(url: str) -> None:
-    parsed = urlparse(url)
-    if not parsed.scheme or not parsed.netloc:
-        raise ArchiveExtractionError("URL must include scheme and host")
-    if not ARCHIVE_PATH_RE.search(parsed.path):
-        raise ArchiveExtractionError("URL path must match /archives/<id>/ pattern")
+    if not ARCHIVE_URL_RE.match(url):
+        raise ArchiveExtractionError("URL must include scheme and host and a path matching /archives/<id>/")
 
 
 def fetch_html(url: str, cookies: Optional[Dict[str, str]] = None) -> str:
+    session = _get_session()
+    import requests
+
     try:
-        resp = requests.get(url, headers=DEFAULT_HEADERS, timeout=20, cookies=cookies)
+        resp = session.get(url, timeout=20, cookies=cookies)
         resp.raise_for_status()
         return resp.text
     except requests.RequestException as exc:  # pragma: no cover - network guard
@@ -77,10 +143,13 @@ def fetch_html(url: str, cookies: Optional[Dict[str, str]] = None) -> str:
 def parse_dplayer_configs(html: str) -> List[Dict[str, object]]:
     configs: List[Dict[str, object]] = []
     for match in DPLAYER_RE.finditer(html):
-        raw = unescape(match.group("data"))
+        data = match.group("single")
+        if data is None:
+            data = match.group("double")
+        raw = unescape(data)
         try:
-            cfg = json.loads(raw)
-        except json.JSONDecodeError:
+            cfg = json_loads(raw)
+        except ValueError:
             continue
         if isinstance(cfg, dict):
             configs.append(cfg)
@@ -88,72 +157,80 @@ def parse_dplayer_configs(html: str) -> List[Dict[str, object]]:
 
 
 def parse_stream_inf_attributes(attr: str) -> Dict[str, str]:
-    result: Dict[str, str] = {}
-    for part in attr.split(","):
-        if "=" not in part:
-            continue
-        key, value = part.split("=", 1)
-        key = key.strip()
-        value = value.strip().strip('"')
-        result[key] = value
-    return result
+    return {
+        m.group(1): (m.group(2) if m.group(2) is not None else m.group(3)).strip()
+        for m in STREAM_INF_ATTR_RE.finditer(attr)
+    }
+
+
+def _stream_inf_score(attrs: Dict[str, str]) -> Tuple[int, int]:
+    resolution = attrs.get("RESOLUTION", "")
+    height = -1
+    if "x" in resolution:
+        parts = resolution.lower().split("x", 1)
+        try:
+            height = int(parts[1])
+        except ValueError:
+            height = -1
+    bandwidth = -1
+    bw = attrs.get("AVERAGE-BANDWIDTH") or attrs.get("BANDWIDTH")
+    if bw:
+        try:
+            bandwidth = int(bw)
+        except ValueError:
+            bandwidth = -1
+    return height, bandwidth
 
 
 def choose_best_hls_variant(master_url: str, referer: str) -> str:
+    # Only the referer's origin is sent (as browsers do for cross-origin
+    # requests), so every page on a mirror shares one cache entry per master.
+    parts = urlsplit(referer)
+    if parts.scheme and parts.netloc:
+        referer = f"{parts.scheme}://{parts.netloc}/"
+    return _choose_best_hls_variant_cached(master_url, referer)
+
+
+@functools.lru_cache(maxsize=1024)
+def _choose_best_hls_variant_cached(master_url: str, referer: str) -> str:
+    session = _get_session()
+    import requests
+
     headers = dict(M3U8_HEADERS)
     headers["Referer"] = referer
     try:
-        resp = requests.get(master_url, headers=headers, timeout=20)
+        resp = session.get(master_url, headers=headers, timeout=20, stream=True)
         resp.raise_for_status()
     except requests.RequestException as exc:  # pragma: no cover - network guard
         raise ArchiveExtractionError(f"Failed to load m3u8: {exc}") from exc
 
-    playlist = resp.text
-    if "#EXT-X-STREAM-INF" not in playlist:
-        return master_url
-
     best_url: Optional[str] = None
     best_score: Tuple[int, int] = (-1, -1)
+    pending_attrs: Optional[Dict[str, str]] = None
 
-    lines = [line.strip() for line in playlist.splitlines() if line.strip()]
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        if line.startswith("#EXT-X-STREAM-INF:"):
-            attrs = parse_stream_inf_attributes(line.split(":", 1)[1])
-            resolution = attrs.get("RESOLUTION", "")
-            height = -1
-            if "x" in resolution:
-                parts = resolution.lower().split("x", 1)
-                try:
-                    height = int(parts[1])
-                except ValueError:
-                    height = -1
-            bandwidth = -1
-            bw = attrs.get("AVERAGE-BANDWIDTH") or attrs.get("BANDWIDTH")
-            if bw:
-                try:
-                    bandwidth = int(bw)
-                except ValueError:
-                    bandwidth = -1
-
-            j = i + 1
-            stream_url: Optional[str] = None
-            while j < len(lines):
-                candidate = lines[j]
-                if candidate.startswith("#"):
-                    j += 1
+    # Single pass over the streamed playlist: remember the attributes of the
+    # last #EXT-X-STREAM-INF tag and score them against the URI that follows.
+    # Lines stay as bytes; only the attributes and winning URIs are decoded.
+    with resp:
+        try:
+            for raw in resp.iter_lines(decode_unicode=False):
+                line = raw.strip()
+                if not line:
                     continue
-                stream_url = urljoin(master_url, candidate)
-                break
-            if stream_url:
-                score = (height, bandwidth)
-                if score > best_score:
-                    best_score = score
-                    best_url = stream_url
-            i = j
-        else:
-            i += 1
+                if line.startswith(b"#EXT-X-STREAM-INF:"):
+                    attrs = line.split(b":", 1)[1].decode("utf-8", "replace")
+                    pending_attrs = parse_stream_inf_attributes(attrs)
+                elif line.startswith(b"#EXTINF") and best_url is None and pending_attrs is None:
+                    # Media playlist rather than a master: nothing to choose from.
+                    return master_url
+                elif pending_attrs is not None and not line.startswith(b"#"):
+                    score = _stream_inf_score(pending_attrs)
+                    if score > best_score:
+                        best_score = score
+                        best_url = urljoin(master_url, line.decode("utf-8", "replace"))
+                    pending_attrs = None
+        except requests.RequestException as exc:  # pragma: no cover - network guard
+            raise ArchiveExtractionError(f"Failed to load m3u8: {exc}") from exc
     return best_url or master_url
 
 
@@ -177,9 +254,14 @@ def extract_videos(url: str, cookies: Optional[Dict[str, str]] = None) -> List[V
     ensure_archive_url(url)
     html = fetch_html(url, cookies=cookies)
     configs = parse_dplayer_configs(html)
+    if len(configs) > 1:
+        resolved_urls = list(
+            _RESOLVE_EXECUTOR.map(lambda cfg: resolve_video_url(cfg, referer=url), configs)
+        )
+    else:
+        resolved_urls = [resolve_video_url(cfg, referer=url) for cfg in configs]
     videos: List[VideoResult] = []
-    for idx, cfg in enumerate(configs, 1):
-        resolved = resolve_video_url(cfg, referer=url)
+    for idx, resolved in enumerate(resolved_urls, 1):
         if resolved:
             videos.append(VideoResult(index=idx, url=resolved))
     return videos
@@ -32,26 +32,37 @@ Environment variables::
 from __future__ import annotations
 
 import argparse
-import json
+import functools
+import mmap
 import os
 import re
 import sys
+import threading
 from dataclasses import dataclass
 from html import unescape
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    import requests
 
 try:
-    import requests  # type: ignore
-except Exception as exc:  # pragma: no cover - import guard
-    print(
-        "This script requires the requests package. Install with: pip3 install requests",
-        file=sys.stderr,
-    )
-    raise
+    from orjson import loads as json_loads  # type: ignore
+except ImportError:  # pragma: no cover - optional speedup
+    from json import loads as json_loads
 
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser  # type: ignore
+except ImportError:  # pragma: no cover - optional speedup
+    HTMLParser = None
 
-TWEET_URL_RE = re.compile(r"https?://(?:www\.)?(?:x|twitter)\.com/[^/]+/status/(\d+)")
+
+# Matched against the URL with query string and fragment removed; trailing
+# segments such as ``/video/1`` or ``/photo/1`` are still accepted.
+TWEET_URL_RE = re.compile(
+    r"https?://(?:www\.)?(?:x|twitter)\.com/[^/]+/status/(\d+)(?:/[^?#]*)?",
+    re.ASCII,
+)
 DEFAULT_HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
@@ -68,7 +79,83 @@ META_CONTENT_RE = re.compile(r"content=['\"](?P<msg>[^'\"]+)['\"]", re.IGNORECAS
 HTML_TITLE_RE = re.compile(r"<title>(?P<title>.*?)</title>", re.IGNORECASE | re.DOTALL)
 
 TWEET_STATUS_URL = "https://cdn.syndication.twimg.com/tweet-result"
-def _extract_html_error_message(payload: str) -> Optional[str]:
+VIDEO_MEDIA_TYPES = frozenset({"video", "gif"})
+TWEET_STATUS_CONCURRENCY = 2
+_TWEET_STATUS_SLOTS = threading.BoundedSemaphore(TWEET_STATUS_CONCURRENCY)
+
+
+def _build_session() -> "requests.Session":
+    try:
+        import requests  # type: ignore
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+    except Exception:  # pragma: no cover - import guard
+        print(
+            "This script requires the requests package. Install with: pip3 install requests",
+            file=sys.stderr,
+        )
+        raise
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=32,
+        # Retry only transient gateway errors, and never sleep for a server's
+        # Retry-After: urllib3 does not cap it and the request timeout does
+        # not cover it. Rate limits (429) surface via raise_for_status.
+        max_retries=Retry(
+            total=2,
+            backoff_factor=0.2,
+            status_forcelist=[502, 503, 504],
+            respect_retry_after_header=False,
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # The tweet status lookup is best-effort diagnostics, so it gets a single
+    # attempt; requests routes it here as the longest matching mount prefix.
+    session.mount(
+        TWEET_STATUS_URL,
+        HTTPAdapter(pool_connections=1, pool_maxsize=TWEET_STATUS_CONCURRENCY, max_retries=0),
+    )
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+# Shared across calls so back-to-back vxtwitter/syndication lookups reuse
+# pooled keep-alive connections. Built on first use so that importing this
+# module (or exiting early from a CLI) does not pay for importing requests.
+_SESSION: Optional["requests.Session"] = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _get_session() -> "requests.Session":
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                _SESSION = _build_session()
+    return _SESSION
+
+
+def _parse_html_error_message(payload: str) -> Optional[str]:
+    # selectolax already decodes entities in attributes and text.
+    tree = HTMLParser(payload)
+    meta = tree.css_first('meta[property="og:description" i]')
+    if meta is not None:
+        message = (meta.attributes.get("content") or "").strip()
+        if message:
+            return message
+
+    title_node = tree.css_first("title")
+    if title_node is not None:
+        title = (title_node.text() or "").strip()
+        if title:
+            return title
+    return None
+
+
+def _scan_html_error_message(payload: str) -> Optional[str]:
     meta_match = VXTWITTER_ERROR_META_RE.search(payload)
     if meta_match:
         tag = meta_match.group(0)
@@ -83,6 +170,18 @@ def _extract_html_error_message(payload: str) -> Optional[str]:
         title = unescape(title_match.group("title")).strip()
         if title:
             return title
+    return None
+
+
+def _extract_html_error_message(payload: str) -> Optional[str]:
+    # selectolax parses the page once in C; the regex scan is the fallback
+    # when it is not installed.
+    if HTMLParser is not None:
+        message = _parse_html_error_message(payload)
+    else:
+        message = _scan_html_error_message(payload)
+    if message:
+        return message
 
     for line in payload.splitlines():
         line = unescape(line.strip())
@@ -92,18 +191,27 @@ def _extract_html_error_message(payload: str) -> Optional[str]:
 
 
 def _describe_tweet_unavailability(tweet_id: str) -> Optional[str]:
-    params = {"id": tweet_id, "lang": "en", "token": "Bearer"}
-    try:
-        resp = requests.get(TWEET_STATUS_URL, params=params, headers=DEFAULT_HEADERS, timeout=10)
-        resp.raise_for_status()
-    except requests.RequestException:
-        return None
+    import requests
 
+    # Errors escape the cached lookup, so a timeout or a garbled response is
+    # retried next time instead of hiding the tweet's status for the run.
     try:
-        data = resp.json()
-    except ValueError:
+        return _lookup_tweet_unavailability(tweet_id)
+    except (requests.RequestException, ValueError):
         return None
 
+
+@functools.lru_cache(maxsize=2048)
+def _lookup_tweet_unavailability(tweet_id: str) -> Optional[str]:
+    session = _get_session()
+    params = {"id": tweet_id, "lang": "en", "token": "Bearer"}
+    # Only a diagnostic lookup: keep concurrent extractions from piling
+    # onto the syndication API and give up quickly when it is slow.
+    with _TWEET_STATUS_SLOTS:
+        resp = session.get(TWEET_STATUS_URL, params=params, timeout=5)
+    resp.raise_for_status()
+    data = json_loads(resp.content)
+
     if isinstance(data, dict):
         typename = data.get("__typename")
         if typename == "TweetTombstone":
@@ -129,6 +237,72 @@ class ExtractedVideo:
     width: Optional[int]
 
 
+VideoFields = Tuple[str, str, Optional[int], Optional[int], Optional[int]]
+
+
+class ExtractedBatch:
+    """Videos found for one tweet, stored column-wise (one list per field).
+
+    Behaves like the list of ``ExtractedVideo`` it replaces: ``len``, truth
+    testing and iteration all go over the videos.
+    """
+
+    __slots__ = ("ids", "urls", "bitrates", "heights", "widths")
+
+    def __init__(
+        self,
+        ids: List[str],
+        urls: List[str],
+        bitrates: List[Optional[int]],
+        heights: List[Optional[int]],
+        widths: List[Optional[int]],
+    ) -> None:
+        self.ids = ids
+        self.urls = urls
+        self.bitrates = bitrates
+        self.heights = heights
+        self.widths = widths
+
+    @classmethod
+    def empty(cls) -> "ExtractedBatch":
+        return cls([], [], [], [], [])
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def __bool__(self) -> bool:
+        return bool(self.urls)
+
+    def __iter__(self) -> Iterator[ExtractedVideo]:
+        return self.rows()
+
+    def append(
+        self,
+        identifier: str,
+        url: str,
+        bitrate: Optional[int],
+        height: Optional[int],
+        width: Optional[int],
+    ) -> None:
+        self.ids.append(identifier)
+        self.urls.append(url)
+        self.bitrates.append(bitrate)
+        self.heights.append(height)
+        self.widths.append(width)
+
+    def rows(self) -> Iterator[ExtractedVideo]:
+        for identifier, url, bitrate, height, width in zip(
+            self.ids, self.urls, self.bitrates, self.heights, self.widths
+        ):
+            yield ExtractedVideo(
+                identifier=identifier,
+                url=url,
+                bitrate=bitrate,
+                height=height,
+                width=width,
+            )
+
+
 def parse_cookie_string(cookie_str: str) -> Dict[str, str]:
     cookies: Dict[str, str] = {}
     for part in cookie_str.split(";"):
@@ -140,34 +314,66 @@ def parse_cookie_string(cookie_str: str) -> Dict[str, str]:
     return cookies
 
 
+@functools.lru_cache(maxsize=16)
+def _load_cookies_cached(
+    loader: Callable[[str], Dict[str, str]], path: str, mtime_ns: int
+) -> Dict[str, str]:
+    return loader(path)
+
+
+def _load_cookies_by_mtime(
+    loader: Callable[[str], Dict[str, str]], path: str, label: str
+) -> Dict[str, str]:
+    # Batch drivers resolve cookies repeatedly within one process; only
+    # re-parse the file when it has changed on disk since the last load.
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError as exc:
+        raise FileNotFoundError(f"{label} not found: {path}") from exc
+    return dict(_load_cookies_cached(loader, path, mtime_ns))
+
+
 def load_cookie_file(path: str) -> Dict[str, str]:
+    return _load_cookies_by_mtime(_read_cookie_file, path, "Cookie file")
+
+
+def load_cookie_json(path: str) -> Dict[str, str]:
+    return _load_cookies_by_mtime(_read_cookie_json, path, "Cookie JSON")
+
+
+def _read_cookie_file(path: str) -> Dict[str, str]:
     cookies: Dict[str, str] = {}
     try:
-        with open(path, "r", encoding="utf-8") as fh:
-            for line in fh:
-                stripped = line.strip()
-                if not stripped or stripped.startswith("#"):
-                    continue
-                if "\t" in stripped:
-                    parts = stripped.split("\t")
-                    if len(parts) >= 7:
-                        cookies[parts[5]] = parts[6]
+        with open(path, "rb") as fh:
+            if os.fstat(fh.fileno()).st_size == 0:
+                return cookies
+            # Scan the mapped bytes directly and decode only the name/value
+            # fragments; comment lines are never decoded.
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for line in iter(mm.readline, b""):
+                    stripped = line.strip()
+                    if not stripped or stripped.startswith(b"#"):
                         continue
-                if "=" in stripped:
-                    name, value = stripped.split("=", 1)
-                    cookies[name.strip()] = value.strip()
+                    if b"\t" in stripped:
+                        parts = stripped.split(b"\t")
+                        if len(parts) >= 7:
+                            cookies[parts[5].decode("utf-8")] = parts[6].decode("utf-8")
+                            continue
+                    if b"=" in stripped:
+                        name, value = stripped.split(b"=", 1)
+                        cookies[name.strip().decode("utf-8")] = value.strip().decode("utf-8")
     except FileNotFoundError as exc:
         raise FileNotFoundError(f"Cookie file not found: {path}") from exc
     return cookies
 
 
-def load_cookie_json(path: str) -> Dict[str, str]:
+def _read_cookie_json(path: str) -> Dict[str, str]:
     try:
-        with open(path, "r", encoding="utf-8") as fh:
-            payload = json.load(fh)
+        with open(path, "rb") as fh:
+            payload = json_loads(fh.read())
     except FileNotFoundError as exc:
         raise FileNotFoundError(f"Cookie JSON not found: {path}") from exc
-    except json.JSONDecodeError as exc:
+    except ValueError as exc:
         raise ValueError(f"Invalid cookie JSON in {path}: {exc}") from exc
 
     cookies: Dict[str, str] = {}
@@ -206,62 +412,86 @@ def build_cookie_jar(*sources: Optional[Dict[str, str]]) -> Optional[Dict[str, s
 
 
 def choose_best_variant(variants: Iterable[Dict[str, object]]) -> Optional[Dict[str, object]]:
-    materialized = list(variants)
-    if not materialized:
-        return None
-    def score(v: Dict[str, object]) -> Tuple[int, int, int, int]:
+    # Exact video/mp4 variants lead the score tuple, so they outrank the rest
+    # without a separate filtering pass; among the others, any *mp4* type
+    # still beats non-mp4 ones.
+    def score(v: Dict[str, object]) -> Tuple[int, int, int, int, int]:
         content_type = (v.get("content_type") or "").lower()
+        bitrate = v.get("bitrate") or 0
+        height = v.get("height") or 0
+        width = v.get("width") or 0
+        is_video_mp4 = 1 if content_type == "video/mp4" else 0
         mp4_bonus = 1 if "mp4" in content_type else 0
-        bitrate = int(v.get("bitrate") or 0)
-        height = int(v.get("height") or 0)
-        width = int(v.get("width") or 0)
-        return (mp4_bonus, bitrate, height, width)
-    candidates = [v for v in materialized if (v.get("content_type") or "").lower() == "video/mp4"]
-    ranked_pool = candidates or materialized
-    return max(ranked_pool, key=score)
+        return (is_video_mp4, mp4_bonus, int(bitrate), int(height), int(width))
+    return max(variants, key=score, default=None)
 
 
-def extract_videos_from_media(tweet_id: str, media_obj: Dict[str, object]) -> Optional[ExtractedVideo]:
+def _media_fields(tweet_id: str, media_obj: Dict[str, object]) -> Optional[VideoFields]:
     variants = media_obj.get("variants") or []
     if isinstance(variants, list) and variants:
         best_variant = choose_best_variant(variants)
         if best_variant and best_variant.get("url"):
-            return ExtractedVideo(
-                identifier=f"{tweet_id}-{media_obj.get('id', 'media')}",
-                url=str(best_variant.get("url")),
-                bitrate=int(best_variant.get("bitrate") or 0) or None,
-                height=int(best_variant.get("height") or 0) or None,
-                width=int(best_variant.get("width") or 0) or None,
+            return (
+                f"{tweet_id}-{media_obj.get('id', 'media')}",
+                str(best_variant.get("url")),
+                int(best_variant.get("bitrate") or 0) or None,
+                int(best_variant.get("height") or 0) or None,
+                int(best_variant.get("width") or 0) or None,
             )
     video_url = media_obj.get("url")
     if isinstance(video_url, str) and video_url:
-        return ExtractedVideo(
-            identifier=f"{tweet_id}-{media_obj.get('id', 'media')}",
-            url=video_url,
-            bitrate=None,
-            height=int(media_obj.get("height") or 0) or None,
-            width=int(media_obj.get("width") or 0) or None,
+        return (
+            f"{tweet_id}-{media_obj.get('id', 'media')}",
+            video_url,
+            None,
+            int(media_obj.get("height") or 0) or None,
+            int(media_obj.get("width") or 0) or None,
         )
     return None
 
 
-def extract_with_vxtwitter(url: str, cookies: Optional[Dict[str, str]] = None) -> List[ExtractedVideo]:
-    match = TWEET_URL_RE.match(url)
+def extract_videos_from_media(tweet_id: str, media_obj: Dict[str, object]) -> Optional[ExtractedVideo]:
+    fields = _media_fields(tweet_id, media_obj)
+    if fields is None:
+        return None
+    identifier, url, bitrate, height, width = fields
+    return ExtractedVideo(identifier=identifier, url=url, bitrate=bitrate, height=height, width=width)
+
+
+def _collect_media(batch: ExtractedBatch, tweet_id: str, items: object) -> None:
+    if not isinstance(items, list):
+        return
+    for media_obj in items:
+        if not isinstance(media_obj, dict):
+            continue
+        media_type = media_obj.get("type")
+        if not isinstance(media_type, str) or media_type.lower() not in VIDEO_MEDIA_TYPES:
+            continue
+        fields = _media_fields(tweet_id, media_obj)
+        if fields:
+            batch.append(*fields)
+
+
+def extract_with_vxtwitter(url: str, cookies: Optional[Dict[str, str]] = None) -> ExtractedBatch:
+    match = TWEET_URL_RE.fullmatch(url.strip().split("#", 1)[0].split("?", 1)[0].rstrip("/"))
     if not match:
         raise ValueError("URL does not look like a valid X status link.")
     tweet_id = match.group(1)
     api_url = f"https://api.vxtwitter.com/Twitter/status/{tweet_id}"
 
+    session = _get_session()
+    import requests
+
     try:
-        response = requests.get(api_url, headers=DEFAULT_HEADERS, cookies=cookies, timeout=20)
+        response = session.get(api_url, cookies=cookies, timeout=20)
         response.raise_for_status()
     except requests.RequestException as exc:
         raise RuntimeError(f"Request to vxtwitter failed: {exc}") from exc
 
     content_type = (response.headers.get("Content-Type") or "").lower()
-    text_payload = response.text
 
     if "application/json" not in content_type:
+        text_payload = response.text
         message = _extract_html_error_message(text_payload)
         details = []
         if message:
@@ -280,8 +510,9 @@ def extract_with_vxtwitter(url: str, cookies: Optional[Dict[str, str]] = None) -
         raise RuntimeError(f"vxtwitter error: {'; '.join(details)}")
 
     try:
-        data = json.loads(text_payload)
-    except json.JSONDecodeError as exc:
+        data = json_loads(response.content)
+    except ValueError as exc:
+        text_payload = response.text
         message = _extract_html_error_message(text_payload)
         details = [message or f"unexpected payload starting with {text_payload[:120]!r}"]
         tombstone = _describe_tweet_unavailability(tweet_id)
@@ -289,64 +520,36 @@ def extract_with_vxtwitter(url: str, cookies: Optional[Dict[str, str]] = None) -
             details.append(f"tweet status: {tombstone}")
         raise RuntimeError(f"vxtwitter JSON parse error: {'; '.join(details)}") from exc
 
-    videos: List[ExtractedVideo] = []
-    media_ext = data.get("media_extended") or []
-    if isinstance(media_ext, list) and media_ext:
-        for media_obj in media_ext:
-            if not isinstance(media_obj, dict):
-                continue
-            media_type = (media_obj.get("type") or "").lower()
-            if media_type not in {"video", "gif"}:
-                continue
-            item = extract_videos_from_media(tweet_id, media_obj)
-            if item:
-                videos.append(item)
-        if videos:
-            return videos
-
-    media = data.get("media") or []
-    if isinstance(media, list):
-        for media_obj in media:
-            if not isinstance(media_obj, dict):
-                continue
-            media_type = (media_obj.get("type") or "").lower()
-            if media_type not in {"video", "gif"}:
-                continue
-            item = extract_videos_from_media(tweet_id, media_obj)
-            if item:
-                videos.append(item)
-        if videos:
-            return videos
+    batch = ExtractedBatch.empty()
+    _collect_media(batch, tweet_id, data.get("media_extended"))
+    if batch.urls:
+        return batch
+
+    _collect_media(batch, tweet_id, data.get("media"))
+    if batch.urls:
+        return batch
 
     media_urls = data.get("mediaURLs") or []
     if isinstance(media_urls, list):
         for idx, video_url in enumerate(media_urls):
             if isinstance(video_url, str) and video_url:
-                videos.append(
-                    ExtractedVideo(
-                        identifier=f"{tweet_id}-url-{idx}",
-                        url=video_url,
-                        bitrate=None,
-                        height=None,
-                        width=None,
-                    )
-                )
-    return videos
-
-
-def _print_results(url: str, videos: List[ExtractedVideo]) -> None:
+                batch.append(f"{tweet_id}-url-{idx}", video_url, None, None, None)
+    return batch
+
+
+def _print_results(url: str, batch: ExtractedBatch) -> None:
     print(f"URL: {url}")
-    if not videos:
+    if not batch.urls:
         print("  No video URLs found.")
         return
-    for idx, video in enumerate(videos, 1):
+    for idx, (video_url, height, bitrate) in enumerate(zip(batch.urls, batch.heights, batch.bitrates), 1):
         meta_bits = []
-        if video.height:
-            meta_bits.append(f"{video.height}p")
-        if video.bitrate:
-            meta_bits.append(f"{video.bitrate}k")
+        if height:
+            meta_bits.append(f"{height}p")
+        if bitrate:
+            meta_bits.append(f"{bitrate}k")
         meta = f" ({', '.join(meta_bits)})" if meta_bits else ""
-        print(f"  Video {idx}{meta}: {video.url}")
+        print(f"  Video {idx}{meta}: {video_url}")
 
 
 def parse_args(argv: List[str]) -> argparse.Namespace:
@@ -384,12 +587,12 @@ def main(argv: Optional[List[str]] = None) -> int:
 
     for tweet_url in args.tweet_urls:
         try:
-            videos = extract_with_vxtwitter(tweet_url, cookies=cookies)
+            batch = extract_with_vxtwitter(tweet_url, cookies=cookies)
         except Exception as exc:
             print(f"URL: {tweet_url}")
             print(f"  Error: {exc}")
             continue
-        _print_results(tweet_url, videos)
+        _print_results(tweet_url, batch)
     return 0
 
 
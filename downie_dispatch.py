@@ -24,16 +24,26 @@ be retrieved the URL is processed as usual.
 from __future__ import annotations
 
 import argparse
+import functools
 import subprocess
 import sys
-from typing import Dict, Iterable, List, Optional, Set
-from urllib.parse import urlparse
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
-from cate import other_video, twitter_video
-from common.cookie_update_bridge import CookieUpdateFetcher
+# The extractor modules and the cookie-update bridge are imported where they
+# are first needed, so runs that only forward YouTube links (or never use
+# --cookie-update) do not pay for loading them.
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from common.cookie_update_bridge import CookieUpdateFetcher
 
 
 DOWNIE_APP_CANDIDATES = ("Downie 4", "Downie")
+OPEN_BATCH_SIZE = 500
+HOST_STRATEGIES = {
+    "youtube.com": "youtube",
+    "youtu.be": "youtube",
+    "x.com": "twitter",
+    "twitter.com": "twitter",
+}
 
 
 class DispatchError(RuntimeError):
@@ -63,49 +73,98 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     return parser.parse_args(argv)
 
 
-def classify_url(url: str) -> str:
-    parsed = urlparse(url)
-    host = (parsed.netloc or parsed.path).lower()
+def _url_host(url: str) -> str:
+    # Slice the authority out by hand: a full urlparse() result is not needed
+    # just to look at the host.
+    text = url.strip()
+    if text.startswith(("https://", "http://")):
+        # Common case: a plain host runs from the scheme to the first "/".
+        start = 8 if text[4] == "s" else 7
+        end = text.find("/", start)
+        host = text[start:end] if end >= 0 else text[start:]
+        if "?" not in host and "#" not in host and "@" not in host and ":" not in host:
+            return host.lower()
+    scheme_end = text.find("://")
+    rest = text[scheme_end + 3:] if scheme_end >= 0 else text
+    end = len(rest)
+    for sep in "/?#":
+        pos = rest.find(sep, 0, end)
+        if pos >= 0:
+            end = pos
+    host = rest[:end].lower()
+    return host.rsplit("@", 1)[-1].split(":", 1)[0]
+
+
+@functools.lru_cache(maxsize=4096)
+def classify_url(url: str) -> Tuple[str, str]:
+    # Returns (strategy, host) so callers need not parse the URL again.
+    host = _url_host(url)
     if not host:
         raise DispatchError("URL must include a hostname")
-    host = host.split("@")[-1]
-    host = host.split(":", 1)[0]
-    if host.endswith("youtube.com") or host.endswith("youtu.be"):
-        return "youtube"
-    if host.endswith("x.com") or host.endswith("twitter.com"):
-        return "twitter"
-    return "other"
+    return _classify_host(host), host
 
 
-def send_to_downie(urls: Iterable[str]) -> None:
+@functools.lru_cache(maxsize=1024)
+def _classify_host(host: str) -> str:
+    # Look up the registrable domain (last two labels) so subdomains such as
+    # m.youtube.com match while look-alikes such as fox.com do not.
+    registrable = ".".join(host.rstrip(".").rsplit(".", 2)[-2:])
+    return HOST_STRATEGIES.get(registrable, "other")
+
+
+def send_to_downie(urls: Iterable[str], emit: Callable[[str], None] = print) -> None:
     seen: Set[str] = set()
+    pending: List[str] = []
     for url in urls:
         normalized = url.strip()
         if not normalized or normalized in seen:
             continue
         seen.add(normalized)
+        pending.append(normalized)
+
+    # ``open`` accepts several URLs per invocation, so hand them over in
+    # batches (bounded to stay well under ARG_MAX) instead of one process each.
+    for start in range(0, len(pending), OPEN_BATCH_SIZE):
+        batch = pending[start:start + OPEN_BATCH_SIZE]
         last_error: Optional[str] = None
         for app in DOWNIE_APP_CANDIDATES:
             result = subprocess.run(
-                ["open", "-g", "-a", app, normalized],
-                capture_output=True,
-                text=True,
+                ["open", "-g", "-a", app, *batch],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
                 check=False,
             )
             if result.returncode == 0:
                 break
-            last_error = result.stderr.strip() or result.stdout.strip() or f"open -a {app} failed"
+            # ``open`` reports problems on stderr; a single pipe keeps the
+            # diagnostic without a second run, and is decoded on failure only.
+            output = (result.stderr or b"").strip()
+            last_error = output.decode("utf-8", "replace") if output else f"open -a {app} failed"
         else:
             raise DispatchError(f"Failed to hand off to Downie 4: {last_error or 'unknown error'}")
-        print(f"  Sent to Downie: {normalized}")
+        for normalized in batch:
+            emit(f"  Sent to Downie: {normalized}")
 
 
 def resolve_twitter_cookies(args: argparse.Namespace) -> Optional[Dict[str, str]]:
-    temp_args = argparse.Namespace(
-        cookie=args.cookie,
-        cookie_file=args.cookie_file,
-        cookie_json=getattr(args, "cookie_json", None),
+    return _resolve_twitter_cookies_cached(
+        getattr(args, "cookie", None),
+        getattr(args, "cookie_file", None),
+        getattr(args, "cookie_json", None),
     )
+
+
+@functools.lru_cache(maxsize=8)
+def _resolve_twitter_cookies_cached(
+    cookie: Optional[str],
+    cookie_file: Optional[str],
+    cookie_json: Optional[str],
+) -> Optional[Dict[str, str]]:
+    # Cookie sources are fixed for the lifetime of a run, so resolve (and
+    # report failures for) each combination only once.
+    from cate import twitter_video
+
+    temp_args = argparse.Namespace(cookie=cookie, cookie_file=cookie_file, cookie_json=cookie_json)
     try:
         return twitter_video.resolve_cookies(temp_args)
     except Exception as exc:
@@ -128,12 +187,35 @@ def merge_cookie_dicts(
     return merged
 
 
+def lookup_domain_cookies(
+    cookie_fetcher: CookieUpdateFetcher,
+    url: str,
+    cookie_status: Dict[str, bool],
+    emit: Callable[[str], None] = print,
+) -> Optional[Dict[str, str]]:
+    bundle = cookie_fetcher.get_bundle(url)
+    if bundle and bundle.requests:
+        if bundle.domain not in cookie_status:
+            emit(f"  cookie-update: loaded {len(bundle.requests)} cookies for {bundle.domain}")
+            cookie_status[bundle.domain] = True
+        return bundle.requests
+    normalized = type(cookie_fetcher)._normalize_domain(url)  # type: ignore[attr-defined]
+    if normalized and normalized not in cookie_status:
+        emit(f"  cookie-update: no cookies available for {normalized}, proceeding without them")
+        cookie_status[normalized] = False
+    return None
+
+
 def extract_links(url: str, strategy: str, cookies: Optional[Dict[str, str]]) -> List[str]:
     if strategy == "youtube":
         return [url]
     if strategy == "twitter":
-        videos = twitter_video.extract_with_vxtwitter(url, cookies=cookies)
-        return [item.url for item in videos if item.url]
+        from cate import twitter_video
+
+        batch = twitter_video.extract_with_vxtwitter(url, cookies=cookies)
+        return [video_url for video_url in batch.urls if video_url]
+    from cate import other_video
+
     results = other_video.extract_videos(url, cookies=cookies)
     return [item.url for item in results if item.url]
 
@@ -142,65 +224,71 @@ def main(argv: Optional[List[str]] = None) -> int:
     args = parse_args(argv)
     cookie_fetcher: Optional[CookieUpdateFetcher] = None
     cookie_status: Dict[str, bool] = {}
+    host_cookies: Dict[str, Optional[Dict[str, str]]] = {}
+    merged_cookies: Dict[str, Optional[Dict[str, str]]] = {}
     twitter_cookies: Optional[Dict[str, str]] = None
-    twitter_cookies_loaded = False
     if getattr(args, "use_cookie_update", False):
+        from common.cookie_update_bridge import CookieUpdateFetcher
+
         cookie_fetcher = CookieUpdateFetcher()
     exit_code = 0
 
+    # A URL's header goes out straight away (ahead of any stderr warnings it
+    # triggers); the rest of its report is collected and written in one go
+    # rather than issuing a separate print (and possibly flush) per line. The
+    # finally clause makes sure it is written even if an exception escapes.
+    lines: List[str] = []
+    emit = lines.append
     for original_url in args.urls:
-        print(f"URL: {original_url}")
-        try:
-            strategy = classify_url(original_url)
-        except DispatchError as exc:
-            print(f"  Error: {exc}")
-            exit_code = 1
-            continue
-
-        if strategy == "twitter" and not twitter_cookies_loaded:
-            twitter_cookies = resolve_twitter_cookies(args)
-            twitter_cookies_loaded = True
-
-        domain_cookies: Optional[Dict[str, str]] = None
-        if cookie_fetcher:
-            bundle = cookie_fetcher.get_bundle(original_url)
-            if bundle and bundle.requests:
-                domain_cookies = bundle.requests
-                if bundle.domain not in cookie_status:
-                    print(
-                        f"  cookie-update: loaded {len(bundle.requests)} cookies for {bundle.domain}"
-                    )
-                    cookie_status[bundle.domain] = True
-            else:
-                normalized = CookieUpdateFetcher._normalize_domain(original_url)  # type: ignore[attr-defined]
-                if normalized and normalized not in cookie_status:
-                    print(
-                        f"  cookie-update: no cookies available for {normalized}, proceeding without them"
-                    )
-                    cookie_status[normalized] = False
-
-        strategy_cookies = domain_cookies
-        if strategy == "twitter":
-            strategy_cookies = merge_cookie_dicts(twitter_cookies, domain_cookies)
-
+        sys.stdout.write(f"URL: {original_url}\n")
         try:
-            links = extract_links(original_url, strategy, strategy_cookies)
-        except Exception as exc:
-            print(f"  Error extracting links: {exc}")
-            exit_code = 1
-            continue
-
-        if not links:
-            print("  No video links found.")
-            exit_code = 1
-            continue
-
-        try:
-            send_to_downie(links)
-        except DispatchError as exc:
-            print(f"  Downie error: {exc}")
-            exit_code = 1
-            continue
+            try:
+                strategy, host = classify_url(original_url)
+            except DispatchError as exc:
+                emit(f"  Error: {exc}")
+                exit_code = 1
+                continue
+
+            if strategy == "twitter":
+                twitter_cookies = resolve_twitter_cookies(args)
+
+            domain_cookies: Optional[Dict[str, str]] = None
+            if cookie_fetcher:
+                # The bridge re-parses the URL on every lookup; cookies only
+                # depend on the host, so look each host up once.
+                if host not in host_cookies:
+                    host_cookies[host] = lookup_domain_cookies(cookie_fetcher, original_url, cookie_status, emit)
+                domain_cookies = host_cookies[host]
+
+            strategy_cookies = domain_cookies
+            if strategy == "twitter":
+                # Both inputs are fixed per host for the run, so merge once per host.
+                if host not in merged_cookies:
+                    merged_cookies[host] = merge_cookie_dicts(twitter_cookies, domain_cookies)
+                strategy_cookies = merged_cookies[host]
+
+            try:
+                links = extract_links(original_url, strategy, strategy_cookies)
+            except Exception as exc:
+                emit(f"  Error extracting links: {exc}")
+                exit_code = 1
+                continue
+
+            if not links:
+                emit("  No video links found.")
+                exit_code = 1
+                continue
+
+            try:
+                send_to_downie(links, emit)
+            except DispatchError as exc:
+                emit(f"  Downie error: {exc}")
+                exit_code = 1
+                continue
+        finally:
+            if lines:
+                sys.stdout.write("\n".join(lines) + "\n")
+                lines.clear()
     return exit_code
 
 
@@ -5,13 +5,29 @@ from __future__ import annotations
 
 import argparse
 import csv
+import hashlib
+import itertools
 import json
+import os
+import re
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Set, Tuple
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import downie_dispatch
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import xxhash  # type: ignore
+except ImportError:  # pragma: no cover - optional speedup
+    xxhash = None
+
 from env_utils import env_path, env_value, load_env_file
 
 
@@ -62,14 +78,22 @@ DEFAULT_COOKIE_FILE = env_path(
     / "singlefile"
     / "xcom.cookies.json",
 )
+DEFAULT_MAX_WORKERS = 16
+MAX_IN_FLIGHT = 64
+WHITESPACE_CLEANUP_RE = re.compile(r"\s\s|[^\S ]|^\s|\s$")
+CSV_SPECIAL_RE = re.compile(r'[,"\r\n]')
+# Matches csv.writer's default dialect, including its \r\n line terminator.
+FAILURE_ROW_TEMPLATE = "{},{},{},{},{},{}\r\n"
 
 __all__ = [
     "DEFAULT_DATA_DIR",
     "DEFAULT_STATE_FILE",
     "DEFAULT_FEED_URL",
     "DEFAULT_FAILURES_FILE",
+    "DEFAULT_MAX_WORKERS",
     "discover_csv_files",
     "extract_urls",
+    "iter_urls",
     "collect_urls",
     "load_state",
     "save_state",
@@ -84,9 +108,19 @@ def discover_csv_files(root: Path) -> List[Path]:
     if not root.exists():
         return []
 
-    for path in root.rglob("*.csv"):
-        if path.is_file():
-            files.add(path)
+    # Walk with os.scandir so the per-entry type checks reuse the cached
+    # dirent data instead of stat()ing a Path object for every entry.
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(".csv") and entry.is_file():
+                        files.add(Path(entry.path))
+        except OSError:
+            continue
 
     special = root / "csv"
     if special.is_file():
@@ -95,47 +129,67 @@ def discover_csv_files(root: Path) -> List[Path]:
     return sorted(files)
 
 
-def extract_urls(path: Path) -> Iterable[str]:
-    with path.open("r", encoding="utf-8", newline="") as fh:
-        try:
-            reader = csv.DictReader(fh)
-            if reader.fieldnames:
-                preferred = ["url", "link", "href", "source"]
-                fallback = reader.fieldnames[0]
-                for row in reader:
-                    value = None
-                    for key in preferred:
-                        candidate = row.get(key)
-                        if candidate:
-                            value = candidate
-                            break
-                    if value is None:
-                        value = row.get(fallback)
-                    if value:
-                        yield value.strip()
-                return
-        except Exception:
-            pass
+URL_COLUMNS = ("url", "link", "href", "source")
+
 
+def extract_urls(path: Path) -> Iterable[str]:
     with path.open("r", encoding="utf-8", newline="") as fh:
         reader = csv.reader(fh)
-        for row in reader:
+        header = next(reader, None)
+        if header is None:
+            return
+
+        # A first row that already holds a link means the file has no header;
+        # otherwise prefer the known URL columns and fall back to the first one.
+        if header and "://" in header[0] and not any(name in URL_COLUMNS for name in header):
+            rows: Iterable[List[str]] = itertools.chain([header], reader)
+            columns: List[int] = []
+        else:
+            rows = reader
+            columns = [header.index(name) for name in URL_COLUMNS if name in header]
+
+        for row in rows:
             if not row:
                 continue
-            yield row[0].strip()
+            value = None
+            for idx in columns:
+                if idx < len(row) and row[idx]:
+                    value = row[idx]
+                    break
+            if value is None:
+                value = row[0]
+            if value:
+                yield value.strip()
+
+
+def _url_key(url: str) -> int:
+    data = url.encode("utf-8", "surrogatepass")
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(data)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def iter_urls(data_dir: Path) -> Iterator[str]:
+    # Track 64-bit digests rather than the URL strings themselves, which are
+    # often long tracking-laden links, so the seen-set stays small. A Bloom
+    # filter is deliberately not used: in front of this set it saves nothing,
+    # and on its own its false positives would silently skip unseen URLs.
+    seen: Set[int] = set()
+    seen_add = seen.add
+    url_key = _url_key
+    for file in discover_csv_files(data_dir):
+        for url in extract_urls(file):
+            if not url:
+                continue
+            key = url_key(url)
+            if key in seen:
+                continue
+            seen_add(key)
+            yield url
 
 
 def collect_urls(data_dir: Path) -> List[str]:
-    csv_files = discover_csv_files(data_dir)
-    urls: List[str] = []
-    seen: Set[str] = set()
-    for file in csv_files:
-        for url in extract_urls(file):
-            if not url or url in seen:
-                continue
-            seen.add(url)
-            urls.append(url)
-    return urls
+    return list(iter_urls(data_dir))
 
 
 def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
@@ -175,6 +229,18 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
         default=str(DEFAULT_FAILURES_FILE),
         help="Where to append failure records",
     )
+    parser.add_argument(
+        "--workers",
+        dest="workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help=f"Number of links extracted concurrently (default: {DEFAULT_MAX_WORKERS})",
+    )
+    parser.add_argument(
+        "--pretty",
+        action="store_true",
+        help="Write state.json indented instead of compact (for debugging)",
+    )
     return parser.parse_args(argv)
 
 
@@ -185,20 +251,50 @@ def load_state(path: Path) -> Dict:
         return json.load(fh)
 
 
-def save_state(path: Path, data: Dict) -> None:
+def save_state(path: Path, data: Dict, *, pretty: bool = False) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as fh:
-        json.dump(data, fh, indent=2, ensure_ascii=False)
-
-
-def append_processed(state: Dict, feed_url: str, entries: Iterable[str]) -> None:
+    # Write compact JSON to a sibling temp file and swap it in, so readers
+    # never observe a half-written state.json.
+    tmp_path = path.with_name(path.name + ".tmp")
+    if orjson is not None:
+        with tmp_path.open("wb") as fh:
+            fh.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0))
+    else:
+        with tmp_path.open("w", encoding="utf-8") as fh:
+            if pretty:
+                json.dump(data, fh, indent=2, ensure_ascii=False)
+            else:
+                json.dump(data, fh, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def append_processed(
+    state: Dict,
+    feed_url: str,
+    entries: Iterable[str],
+    seen: Optional[Set[str]] = None,
+) -> Set[str]:
+    # Callers appending repeatedly to the same state/feed pass the returned
+    # set back in, so the existing entries are not re-hashed on every call.
     processed = state.setdefault("processed_entries", {})
     existing = processed.setdefault(feed_url, [])
-    seen = set(existing)
+    if seen is None:
+        seen = set(existing)
     for entry in entries:
         if entry not in seen:
             existing.append(entry)
             seen.add(entry)
+    return seen
+
+
+def _clean_reason(reason: Optional[str]) -> str:
+    if not reason:
+        return ""
+    # Most reasons are already single-line; only collapse whitespace when
+    # there is a run, a non-space whitespace character or padding to remove.
+    if WHITESPACE_CLEANUP_RE.search(reason):
+        return " ".join(reason.split())
+    return reason
 
 
 def write_failures(
@@ -211,7 +307,11 @@ def write_failures(
     path.parent.mkdir(parents=True, exist_ok=True)
     timestamp = datetime.now().isoformat()
     write_header = not path.exists()
-    with path.open("a", encoding="utf-8", newline="") as fh:
+    rows = [
+        (timestamp, feed_url, url, url, action, _clean_reason(reason))
+        for url, reason in failures
+    ]
+    with path.open("a", encoding="utf-8", newline="", buffering=1 << 16) as fh:
         writer = csv.writer(fh)
         if write_header:
             writer.writerow([
@@ -222,16 +322,26 @@ def write_failures(
                 "action",
                 "reason",
             ])
-        for url, reason in failures:
-            entry_id = url
-            writer.writerow([
-                timestamp,
-                feed_url,
-                entry_id,
-                url,
-                action,
-                " ".join((reason or "").split()),
-            ])
+        # Fields without delimiters, quotes or line breaks are written verbatim
+        # by csv.writer, so plain rows can skip it and be formatted directly.
+        if any(CSV_SPECIAL_RE.search(field) for row in rows for field in row):
+            writer.writerows(rows)
+        else:
+            fh.write("".join(FAILURE_ROW_TEMPLATE.format(*row) for row in rows))
+
+
+def _evaluate_url(
+    url: str,
+    strategy: str,
+    cookies: Optional[Dict[str, str]],
+) -> Tuple[str, Optional[List[str]], Optional[str]]:
+    try:
+        links = downie_dispatch.extract_links(url, strategy, cookies)
+    except Exception as exc:
+        return url, None, f"extract: {exc}"
+    if not links:
+        return url, None, "no video links"
+    return url, links, None
 
 
 def evaluate_urls(
@@ -239,38 +349,52 @@ def evaluate_urls(
     *,
     cookie_file: Optional[str] = None,
     cookie: Optional[str] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
 ) -> Tuple[List[str], List[Tuple[str, str]], Dict[str, List[str]]]:
     successes: List[str] = []
     failures: List[Tuple[str, str]] = []
     extracted: Dict[str, List[str]] = {}
 
     twitter_cookies = None
-    cookies_loaded = False
     namespace = argparse.Namespace(cookie=cookie, cookie_file=cookie_file)
 
-    for url in urls:
-        try:
-            strategy = downie_dispatch.classify_url(url)
-        except Exception as exc:
-            failures.append((url, f"classify: {exc}"))
-            continue
+    def consume(future) -> None:
+        url, links, error = future.result()
+        if links is None:
+            failures.append((url, error or "unknown error"))
+            return
+        successes.append(url)
+        extracted[url] = links
 
-        if strategy == "twitter" and not cookies_loaded:
-            twitter_cookies = downie_dispatch.resolve_twitter_cookies(namespace)
-            cookies_loaded = True
+    # URLs are classified and submitted as the iterable yields them, so CSV
+    # parsing overlaps with extraction. At most MAX_IN_FLIGHT futures are
+    # kept; the oldest is drained first so successes and failures both stay
+    # in input order.
+    in_flight: Deque[Future] = deque()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for url in urls:
+            if len(in_flight) >= MAX_IN_FLIGHT:
+                consume(in_flight.popleft())
+
+            try:
+                strategy, _ = downie_dispatch.classify_url(url)
+            except Exception as exc:
+                # Queue the failure as an already-completed future so it is
+                # reported in order with the extraction results around it.
+                failed: Future = Future()
+                failed.set_result((url, None, f"classify: {exc}"))
+                in_flight.append(failed)
+                continue
 
-        try:
-            links = downie_dispatch.extract_links(url, strategy, twitter_cookies)
-        except Exception as exc:
-            failures.append((url, f"extract: {exc}"))
-            continue
+            if strategy == "twitter":
+                twitter_cookies = downie_dispatch.resolve_twitter_cookies(namespace)
 
-        if not links:
-            failures.append((url, "no video links"))
-            continue
+            in_flight.append(
+                executor.submit(_evaluate_url, url, strategy, twitter_cookies)
+            )
 
-        successes.append(url)
-        extracted[url] = links
+        while in_flight:
+            consume(in_flight.popleft())
 
     return successes, failures, extracted
 
@@ -283,24 +407,23 @@ def main(argv: Optional[List[str]] = None) -> int:
     failures_path = Path(args.failures_file).expanduser()
     feed_url = args.feed_url
 
-    urls = collect_urls(data_dir)
-    if not urls:
-        print("CSV 中没有可用链接")
-        return 1
-
-    print(f"准备检查 {len(urls)} 个链接")
+    print(f"正在从 {data_dir} 读取链接并检查")
 
     successes, failures, _ = evaluate_urls(
-        urls,
+        iter_urls(data_dir),
         cookie_file=args.cookie_file,
         cookie=args.cookie,
+        max_workers=args.workers,
     )
+    if not successes and not failures:
+        print("CSV 中没有可用链接")
+        return 1
 
     print(f"成功解析: {len(successes)} 条, 失败: {len(failures)} 条")
 
     state = load_state(state_path)
     append_processed(state, feed_url, successes)
-    save_state(state_path, state)
+    save_state(state_path, state, pretty=args.pretty)
 
     if failures:
         write_failures(
@@ -4,48 +4,55 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from typing import Iterable, Optional, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 
-def _project_root() -> Path:
-    return Path(__file__).resolve().parent
+# Parsed ``.env`` contents keyed by (path, mtime_ns); the file is only
+# re-tokenized when it changes on disk.
+_CACHE: Dict[Tuple[str, int], List[Tuple[str, str]]] = {}
 
 
-def _parse_line(line: str) -> Tuple[str, str] | None:
-    stripped = line.strip()
-    if not stripped or stripped.startswith("#"):
-        return None
-    if stripped.startswith("export "):
-        stripped = stripped[len("export "):].strip()
-    if "=" not in stripped:
-        return None
-    key, value = stripped.split("=", 1)
-    key = key.strip()
-    if not key:
-        return None
-    value = value.strip()
-    if value and value[0] in {'"', "'"} and value[-1] == value[0]:
-        value = value[1:-1]
-    return key, value
+def _project_root() -> Path:
+    return Path(__file__).resolve().parent
 
 
 def load_env_file(filename: str = ".env") -> None:
     root = _project_root()
     env_path = root / filename
-    if not env_path.exists():
-        return
     try:
-        lines: Iterable[str]
-        with env_path.open("r", encoding="utf-8") as handle:
-            lines = handle.readlines()
+        stat = env_path.stat()
     except OSError:
         return
 
-    for line in lines:
-        parsed = _parse_line(line)
-        if not parsed:
-            continue
-        key, value = parsed
+    cache_key = (str(env_path), stat.st_mtime_ns)
+    pairs = _CACHE.get(cache_key)
+    if pairs is None:
+        pairs = []
+        try:
+            with env_path.open("r", encoding="utf-8") as handle:
+                for line in handle:
+                    if line[:1] in ("#", "\n"):
+                        continue
+                    stripped = line.strip()
+                    if not stripped or stripped[0] == "#":
+                        continue
+                    if stripped.startswith("export "):
+                        stripped = stripped[len("export "):].strip()
+                    key, sep, value = stripped.partition("=")
+                    if not sep:
+                        continue
+                    key = key.strip()
+                    if not key:
+                        continue
+                    value = value.strip()
+                    if value and value[0] in {'"', "'"} and value[-1] == value[0]:
+                        value = value[1:-1]
+                    pairs.append((key, value))
+        except OSError:
+            return
+        _CACHE[cache_key] = pairs
+
+    for key, value in pairs:
         if key in os.environ:
             continue
         os.environ[key] = value